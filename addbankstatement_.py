@@ -1,8 +1,14 @@
 import os
-import re
 import pandas as pd
 import streamlit as st
 import csv
+from forecast import record_transactions
+from categorizer import update_model, lookup_tags
+from utils import track_write
+from ledger import DEFAULT_ACCOUNT, LEDGER_COLUMNS, ensure_ledger_columns
+from statement_parser import extract_account_fields, parse_description
+from fx import BASE_CURRENCY, available_currencies, load_fx_rates
+import write_queue
 
 def convert_xls_to_xlsx(xls_file_path, xlsx_file_path):
     """Converts an .xls file to .xlsx format."""
@@ -49,34 +55,27 @@ def add_bank_statement():
                 df_relevant = df_cleaned.iloc[start_index:].copy()
                 expected_columns = ['Txn Date', 'Value Date', 'Description', 'Ref No./Cheque No.', 'Debit', 'Credit', 'Balance']
                 df_relevant.columns = expected_columns[:len(df_relevant.columns)]
-                df_relevant['Account Name'] = df_relevant['Description'].apply(extract_name_after_third_slash)
+                df_relevant = df_relevant.join(extract_account_fields(df_relevant['Description']))
                 df_relevant.dropna(inplace=True)
                 df_relevant.reset_index(drop=True, inplace=True)
                 df_relevant['Txn Date'] = pd.to_datetime(df_relevant['Txn Date']).dt.date
                 
+                statement_account = st.text_input("Account", value=DEFAULT_ACCOUNT)
+                statement_currency = st.selectbox("Statement Currency", available_currencies(load_fx_rates()[0]))
                 if st.button("Add Transactions from Bank Statement"):
-                    add_transaction(df_relevant)
+                    add_transaction(df_relevant, statement_account, statement_currency)
                 
     except Exception as e:
         st.error(f"Error processing the uploaded file: {str(e)}")
 
 def extract_name_after_third_slash(description):
     """Extracts a name from the given description string after the third slash, or sets to 'Debit Card' or 'Credit Card'."""
-    if not isinstance(description, str):
-        return "Unknown"
-    if 'DEBIT CARD' in description.upper():
-        return "Debit Card" 
-    elif 'CREDIT CARD' in description.upper():
-        return "Credit Card" 
-    parts = description.split('/')
-    if len(parts) > 3:
-        return parts[3].strip()  
-    return "Unknown"
+    return parse_description(description)[0]
 
-def add_transaction(df):
+def add_transaction(df, account=DEFAULT_ACCOUNT, currency=BASE_CURRENCY):
         try:
             try:
-                tag_mapping_df = pd.read_csv("data/tag_mapping.csv")
+                tag_mapping_df = write_queue.read_csv("data/tag_mapping.csv")
                 tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
                 st.write("Tag mapping loaded successfully.")
             except Exception as e:
@@ -93,16 +92,28 @@ def add_transaction(df):
                 st.error(f"User data file not found: {user_file}. Please ensure the file exists.")
                 return
             
-            columns_to_keep = ['Txn Date', 'Account Name', 'Description', 'Debit', 'Credit']
-            df_cleaned = df[columns_to_keep]
+            ensure_ledger_columns(user_file)
+            ledger_df = write_queue.read_csv(user_file, dtype={'reference': str})
+            ledger_references = set(ledger_df['reference'].dropna().astype(str).str.strip())
+            is_duplicate = df['reference'].isin(ledger_references) & (df['reference'] != '')
+            if is_duplicate.any():
+                st.info(f"Skipping {int(is_duplicate.sum())} transactions already in your ledger.")
+
+            columns_to_keep = ['Txn Date', 'Account Name', 'Description', 'Debit', 'Credit', 'channel', 'reference']
+            df_cleaned = df.loc[~is_duplicate, columns_to_keep]
             df_cleaned['Txn Date'] = pd.to_datetime(df_cleaned['Txn Date'], errors='coerce')
+            # Only exact payee matches are applied; classifier guesses stay suggestions in View Transactions.
+            known_tags = lookup_tags(update_model(username, ledger_df), df_cleaned)
 
-            for _, row in df_cleaned.iterrows():
+            written_rows = []
+            for index, row in df_cleaned.iterrows():
                 amount = row['Debit'] if pd.notna(row['Debit']) else row['Credit']
                 amount = int(amount) if pd.notna(amount) and str(amount).strip() else 0  
                 transaction_type = 'Expense' if pd.notna(row['Debit']) else 'Income'
                 description_lower = str(row['Description']).lower()
                 tags = [tag for tag in tag_mapping if tag in description_lower]
+                if not tags and known_tags[index]:
+                    tags = [known_tags[index]]
                 account_name = row['Account Name']
                 row_data = [
                     row['Txn Date'].strftime('%Y-%m-%d') if pd.notna(row['Txn Date']) else '',  # Format date as 'YYYY-MM-DD'
@@ -112,12 +123,17 @@ def add_transaction(df):
                     transaction_type,
                     'Uncategorized',  
                     'Bank Transfer', 
-                    ', '.join(tags) 
+                    ', '.join(tags),
+                    account,
+                    currency,
+                    row['channel'],
+                    row['reference']
                 ]
-                with open(user_file, mode='a', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(row_data)
-            
+                written_rows.append(row_data)
+            future = write_queue.append_rows(user_file, written_rows)
+            track_write("Bank statement transactions", future)
+            written_df = pd.DataFrame(written_rows, columns=LEDGER_COLUMNS)
+            record_transactions(username, written_df, tag_mapping, future)
             st.success("Transactions added successfully!")
         except Exception as e:
             st.error(f"Error adding transaction: {str(e)}")
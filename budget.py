@@ -1,9 +1,16 @@
-import time
 import plotly.express as px
 import os
+import numpy as np
 import pandas as pd
 import streamlit as st
-from utils import check_and_initialize_user_data
+from utils import check_and_initialize_user_data, track_write
+import write_queue
+from budget_engine import map_tag_categories, spend_by_period, rollup_budget_overview, format_budget_overview
+from budget_store import load_budget_store, save_month_budgets
+from forecast import load_spend_state, forecast_month_end, projected_overruns
+from ledger import load_ledger_in
+from periods import MONTH_NAMES, period_key, period_year_month, period_label, current_period, slice_periods, slice_year
+
 def budget():
     st.markdown("<h3 style='color: white;'>Budget</h3>", unsafe_allow_html=True)
     username = st.session_state.get("login_username", "")
@@ -20,82 +27,59 @@ def budget():
         return
 
     try:
-        df = pd.read_csv(user_file)
+        df = load_ledger_in(user_file)
         if df.empty:
             st.warning("No transactions available for this user. Please add transactions to view the budget.")
             return
 
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['month'] = df['date'].dt.strftime('%B')
-        df['year'] = df['date'].dt.year
-        df['tags'] = df['tags'].str.split(',')
-
-        tag_mapping_df = pd.read_csv(tag_mapping_file)
+        tag_mapping_df = write_queue.read_csv(tag_mapping_file)
         tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
-        unique_months = df['month'].unique()
         years = sorted(df['year'].dropna().astype(int).unique())
         if not years:
             st.warning("No data available")
             return
         selected_year = st.selectbox("Select Year", years, index=len(years) - 1)
-        selected_month = st.selectbox("Select Month", unique_months, index=0)
-
-        current_month = pd.to_datetime('today').strftime('%B')
-        current_year = pd.to_datetime('today').year
-        is_current_period = (selected_month == current_month and selected_year == current_year)
-        is_previous_period = (selected_year < current_year) or (selected_year == current_year and unique_months.tolist().index(selected_month) < unique_months.tolist().index(current_month))
-
-        current_df = df[(df['month'] == selected_month) & (df['year'] == selected_year)]
-        current_df = current_df.explode('tags')
-        current_df['tags'] = current_df['tags'].str.strip().str.lower()
-        current_df['category'] = current_df['tags'].map(tag_mapping).fillna('Uncategorized')
+        year_months = sorted(slice_year(df, selected_year)['month'].unique())
+        selected_month = st.selectbox("Select Month", [MONTH_NAMES[month - 1] for month in year_months], index=0)
+        view = st.selectbox("View", ["Month", "Year to Date"])
 
-        current_df = current_df[current_df['category'] != 'Income']
+        selected_month_num = MONTH_NAMES.index(selected_month) + 1
+        selected_period = period_key(selected_year, selected_month_num)
+        is_current_period = (view == "Month" and selected_period == current_period())
+        is_previous_period = selected_period < current_period()
 
-        budget_file = f"data/{username}/{selected_year}_{selected_month}_budget.csv"
+        start_period = selected_period if view == "Month" else period_key(selected_year, 1)
+        months = range(period_year_month(start_period)[1], selected_month_num + 1)
+        overview_label = period_label(selected_period) if view == "Month" else f"January - {period_label(selected_period)}"
 
-        try:
-            budget_df = pd.read_csv(budget_file)
-            existing_budgets = dict(zip(budget_df['Category'], budget_df['Budget']))
-        except FileNotFoundError:
-            existing_budgets = {}
+        df = map_tag_categories(slice_periods(df, start_period, selected_period), tag_mapping)
+        spent = spend_by_period(df)
+        current_df = df[(df['period'] == selected_period) & (df['category'] != 'Income')]
 
-        category_totals = current_df.groupby('category')['amount'].sum()
+        budgets = load_budget_store(username)
+        month_budgets = budgets[
+            (budgets.index.get_level_values('year') == selected_year)
+            & (budgets.index.get_level_values('month') == selected_month_num)
+        ]
+        existing_budgets = month_budgets.droplevel(['year', 'month']).to_dict()
 
-        budget_overview = pd.DataFrame({
-            'Category': category_totals.index,
-            'Spent': category_totals.values.astype(int),
-            'Budget': [existing_budgets.get(category, 0.0) for category in category_totals.index],
-        })
-        budget_overview['Budget'] = budget_overview['Budget'].apply(
-            lambda x: "Budget is not set" if x == 0 else f"{int(x)}"
-        )
-        budget_overview['Remaining'] = budget_overview['Budget'].apply(
-            lambda x: 0 if x == "Budget is not set" else float(x)
-        ) - budget_overview['Spent']
-        budget_overview['Status'] = budget_overview['Remaining'].apply(
-            lambda x: 'Within Budget' if x >= 0 else 'Exceeding Budget'
-        )
-        budget_overview['Remaining'] = budget_overview['Remaining'].astype(int)
-        st.write(f"### Budget Overview for {selected_month} {selected_year}")
-        st.table(budget_overview.round(2))
+        budget_overview = rollup_budget_overview(spent, budgets, selected_year, months)
+        st.write(f"### Budget Overview for {overview_label}")
+        st.table(format_budget_overview(budget_overview))
         st.write("### Budget Usage")
-        budget_overview['Color'] = budget_overview['Status'].map({'Within Budget': 'green', 'Exceeding Budget': 'red'})
+        budget_overview['Color'] = np.where(budget_overview['Status'] == 'Within Budget', 'green', 'red')
         charts_per_row = 2
-        categories = budget_overview['Category'].unique()
-        for i in range(0, len(categories), charts_per_row):
+        rows = list(budget_overview.itertuples(index=False))
+        for i in range(0, len(rows), charts_per_row):
           cols = st.columns(charts_per_row)
-          for j in range(charts_per_row):
-              if i + j < len(categories):
-                  category = categories[i + j]
-                  row = budget_overview[budget_overview['Category'] == category].iloc[0]
+          for j, row in enumerate(rows[i:i + charts_per_row]):
                   fig = px.pie(
                 names=['Spent', 'Remaining'],
-                values=[row['Spent'], max(0, row['Remaining'])],
+                values=[row.Spent, max(0, row.Remaining)],
                 color=['Spent', 'Remaining'],
-                color_discrete_map={'Spent': row['Color'], 'Remaining': 'red'},
+                color_discrete_map={'Spent': row.Color, 'Remaining': 'red'},
                 hole=0.5,
-                title=f"{row['Category']} Budget Usage<br><sub>Status: {row['Status']}</sub>"
+                title=f"{row.Category} Budget Usage<br><sub>Status: {row.Status}</sub>"
             )
 
                   fig.update_traces(
@@ -104,7 +88,7 @@ def budget():
                   fig.update_layout(
                 annotations=[
                     dict(
-                        text=f"<b>{row['Category']}</b>",
+                        text=f"<b>{row.Category}</b>",
                         x=0.5,
                         y=0.5,
                         font_size=14,
@@ -117,6 +101,11 @@ def budget():
             )
                   cols[j].plotly_chart(fig)
         if is_current_period:
+            st.write("### Month-End Forecast")
+            forecast = forecast_month_end(load_spend_state(username, user_file, tag_mapping))
+            for row in projected_overruns(forecast, existing_budgets).itertuples(index=False):
+                st.warning(f"{row.Category} is projected to reach ₹{row.Projected:,.0f} against a budget of ₹{row.Budget:,.0f}")
+            st.table(forecast.round(2))
             st.write("### Set Budget")
             budget_settings = {}
             for category in current_df['category'].unique():
@@ -136,13 +125,8 @@ def budget():
                     st.error(f"Invalid input for {category}. Using default value.")
                     budget_settings[category] = default_value
             if st.button("Save Budget"):
-                budget_data = pd.DataFrame({
-                    'Category': list(budget_settings.keys()),
-                    'Budget': list(budget_settings.values())
-                })
-                budget_data.to_csv(budget_file, index=False)
-                st.success("Budget saved successfully!")
-                time.sleep(2)
+                track_write("Budget", save_month_budgets(username, selected_year, selected_month_num, budget_settings))
+                st.toast("Saving budget...")
                 st.rerun()
         elif is_previous_period:
             st.warning("Budget settings for previous months are locked. You can only view the overview.")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+BUDGET_NOT_SET = "Budget is not set"
+
+def map_tag_categories(df, tag_mapping):
+    """Explodes comma-separated tags and maps each tag to its category, defaulting to 'Uncategorized'."""
+    df = df.assign(tags=df['tags'].astype(str).str.split(',')).explode('tags')
+    df['tags'] = df['tags'].str.strip().str.lower()
+    df['category'] = df['tags'].map(tag_mapping).fillna('Uncategorized')
+    return df
+
+def spend_by_period(df):
+    """Sums expense amounts per (year, month, category) in a single groupby."""
+    expenses = df[df['category'] != 'Income']
+    return expenses.groupby(['year', 'month', 'category'])['amount'].sum()
+
+def compute_budget_overview(spent, budgets):
+    """Computes spent, budget, remaining, utilization % and status per category as array operations.
+
+    `spent` and `budgets` are Series indexed by category; categories without a budget get 0.
+    """
+    spent = spent.astype(float)
+    budget_values = pd.Series(budgets, dtype=float).groupby(level=-1).sum()
+    budget_values = budget_values.reindex(spent.index).fillna(0.0).to_numpy()
+    spent_values = spent.to_numpy()
+    remaining = budget_values - spent_values
+    utilization = np.full(len(spent_values), np.nan)
+    np.divide(spent_values * 100, budget_values, out=utilization, where=budget_values > 0)
+    return pd.DataFrame({
+        'Category': spent.index.to_numpy(),
+        'Spent': spent_values,
+        'Budget': budget_values,
+        'Remaining': remaining,
+        'Utilization %': utilization,
+        'Status': np.where(remaining >= 0, 'Within Budget', 'Exceeding Budget'),
+    })
+
+def rollup_budget_overview(spent, budgets, year, months):
+    """Rolls spend and budgets indexed by (year, month, category) up over `months` of `year`.
+
+    Pass a single month for the monthly view or months 1..N for a year-to-date view.
+    """
+    def _select(series):
+        if series.empty:
+            return pd.Series(dtype=float)
+        years = series.index.get_level_values(0)
+        month_nums = series.index.get_level_values(1)
+        selected = series[(years == year) & np.isin(month_nums, list(months))]
+        return selected.groupby(level=2).sum()
+    return compute_budget_overview(_select(spent), _select(budgets))
+
+def format_budget_overview(overview):
+    """Formats a numeric budget overview for display."""
+    display = overview.copy()
+    display['Spent'] = display['Spent'].round().astype(int)
+    display['Budget'] = np.where(
+        overview['Budget'] > 0,
+        overview['Budget'].round().astype(int).astype(str),
+        BUDGET_NOT_SET
+    )
+    display['Remaining'] = display['Remaining'].round().astype(int)
+    display['Utilization %'] = np.where(
+        overview['Utilization %'].notna(),
+        overview['Utilization %'].round(1).astype(str) + '%',
+        '-'
+    )
+    return display
@@ -0,0 +1,98 @@
+import glob
+import os
+import re
+import pandas as pd
+from periods import MONTH_NAMES
+import write_queue
+
+STORE_COLUMNS = ['year', 'month', 'category', 'budget']
+MONTHLY_BUDGET_FILE = re.compile(r'^(\d{4})_([A-Za-z]+)_budget\.csv$')
+
+def budget_store_path(username):
+    """Returns the path of the consolidated budget store of a user."""
+    return os.path.join("data", username, "budgets.csv")
+
+def _empty_store():
+    index = pd.MultiIndex.from_arrays([[], [], []], names=['year', 'month', 'category'])
+    return pd.Series(dtype=float, index=index, name='budget')
+
+def _to_series(store_df):
+    if store_df.empty:
+        return _empty_store()
+    store_df = store_df.astype({'year': int, 'month': int, 'budget': float})
+    return store_df.set_index(['year', 'month', 'category'])['budget'].sort_index()
+
+def _write_store(username, store):
+    return write_queue.replace_csv(budget_store_path(username), store.reset_index()[STORE_COLUMNS])
+
+def _read_store(username):
+    store_file = budget_store_path(username)
+    if not write_queue.exists(store_file):
+        return _empty_store()
+    return _to_series(write_queue.read_csv(store_file))
+
+def migrate_budget_files(username):
+    """Folds the per-month `<year>_<month>_budget.csv` files of a user into the budget store.
+
+    Rows already in the store win over the monthly files. The monthly files are left in place.
+    """
+    frames = []
+    for budget_file in glob.glob(os.path.join("data", username, "*_budget.csv")):
+        match = MONTHLY_BUDGET_FILE.match(os.path.basename(budget_file))
+        if not match or match.group(2) not in MONTH_NAMES:
+            continue
+        budget_df = pd.read_csv(budget_file).rename(columns={'Category': 'category', 'Budget': 'budget'})
+        budget_df['year'] = int(match.group(1))
+        budget_df['month'] = MONTH_NAMES.index(match.group(2)) + 1
+        frames.append(budget_df[STORE_COLUMNS])
+    store = _read_store(username)
+    if frames:
+        migrated = _to_series(pd.concat(frames, ignore_index=True))
+        store = pd.concat([store, migrated[~migrated.index.isin(store.index)]]).sort_index()
+    _write_store(username, store)
+    return store
+
+def load_budget_store(username):
+    """Loads all budgets of a user as a Series indexed by (year, month, category), migrating on first use."""
+    if not write_queue.exists(budget_store_path(username)):
+        return migrate_budget_files(username)
+    return _read_store(username)
+
+def save_month_budgets(username, year, month, budgets):
+    """Replaces the budgets of one (year, month) in the store with the `budgets` dict.
+
+    The replacement is applied by the write queue to the store as it is when written, so saves
+    from concurrent sessions do not drop each other's months. Returns the Future of the queued write.
+    """
+    load_budget_store(username)
+    new_rows = _to_series(pd.DataFrame({
+        'year': year,
+        'month': month,
+        'category': list(budgets.keys()),
+        'budget': list(budgets.values())
+    }))
+
+    def _replace_month(store_df):
+        store = _empty_store() if store_df is None else _to_series(store_df)
+        keep = ~((store.index.get_level_values('year') == year) & (store.index.get_level_values('month') == month))
+        return pd.concat([store[keep], new_rows]).sort_index().reset_index()[STORE_COLUMNS]
+
+    return write_queue.update_csv(budget_store_path(username), _replace_month)
+
+def budget_vs_actual(budgets, spent, by_category=False):
+    """Aligns budgets and spend indexed by (year, month, category) into a budget-vs-actual time series.
+
+    Returns one row per month (or per month and category) with `budget`, `actual` and `period` columns.
+    Monthly totals only count spend in categories budgeted for that month, so both sides cover the
+    same categories.
+    """
+    levels = ['year', 'month', 'category'] if by_category else ['year', 'month']
+    budgets = budgets.rename_axis(['year', 'month', 'category'])
+    spent = spent.rename_axis(['year', 'month', 'category'])
+    if not by_category:
+        spent = spent[spent.index.isin(budgets.index)]
+    budgets = budgets.groupby(level=levels).sum()
+    spent = spent.groupby(level=levels).sum()
+    series = pd.DataFrame({'budget': budgets, 'actual': spent}).fillna(0.0).reset_index()
+    series['period'] = pd.to_datetime(dict(year=series['year'], month=series['month'], day=1))
+    return series
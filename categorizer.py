@@ -0,0 +1,146 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+import write_queue
+
+N_FEATURES = 2 ** 14
+NGRAM_SIZES = (2, 3, 4)
+MIN_CONFIDENCE = 0.6
+FINGERPRINT_COLUMNS = ['date', 'Account Name', 'description', 'amount', 'tags']
+
+def model_path(username):
+    """Returns the path of the cached tag classifier of a user."""
+    return os.path.join("data", username, "tag_model.npz")
+
+def _features(text):
+    """Hashes the character n-grams of a payee or description into feature indices."""
+    text = f" {' '.join(str(text).lower().split())} "
+    grams = [text[i:i + n] for n in NGRAM_SIZES for i in range(len(text) - n + 1)]
+    return [zlib.crc32(gram.encode('utf-8')) % N_FEATURES for gram in grams]
+
+def _payees(df):
+    return df['Account Name'].fillna('').astype(str).str.strip().str.upper()
+
+def _first_tags(df):
+    return df['tags'].fillna('').astype(str).str.split(',').str[0].str.strip().str.lower()
+
+def _fingerprints(df):
+    """Hashes each ledger row, numbering repeats of identical rows, so rows can be matched in any order."""
+    columns = [column for column in FINGERPRINT_COLUMNS if column in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    repeats = hashes.groupby(hashes.to_numpy()).cumcount()
+    keyed = pd.DataFrame({'hash': hashes.to_numpy(), 'repeat': repeats.to_numpy()})
+    return pd.util.hash_pandas_object(keyed, index=False).to_numpy()
+
+def _empty_model():
+    return {
+        'labels': np.array([], dtype=str),
+        'counts': np.zeros((0, N_FEATURES), dtype=np.int32),
+        'doc_counts': np.zeros(0, dtype=np.int32),
+        'payees': np.array([], dtype=str),
+        'payee_tags': np.array([], dtype=str),
+        'trained': np.array([], dtype=np.uint64),
+    }
+
+def load_model(username):
+    """Loads the cached tag classifier of a user, or an empty one."""
+    path = model_path(username)
+    if not os.path.exists(path):
+        return _empty_model()
+    with np.load(path) as cached:
+        if 'trained' not in cached:
+            return _empty_model()
+        return {
+            'labels': cached['labels'],
+            'counts': cached['counts'],
+            'doc_counts': cached['doc_counts'],
+            'payees': cached['payees'],
+            'payee_tags': cached['payee_tags'],
+            'trained': cached['trained'],
+        }
+
+def save_model(username, model):
+    """Queues the tag classifier of a user to be cached on disk; returns the write's Future."""
+    arrays = dict(model)
+    return write_queue.write_file(model_path(username), lambda file: np.savez_compressed(file, **arrays))
+
+def update_model(username, ledger_df):
+    """Trains the tag classifier incrementally on tagged ledger rows it has not seen yet.
+
+    Rows are matched by fingerprint, so the ledger may be passed in any order; if a row the model
+    was trained on has since been edited or removed, the model is retrained from scratch. The
+    model is a multinomial naive Bayes over hashed character n-grams of the payee, so new rows
+    only add to its counts; a payee lookup of the most recent tag backs it up. The cached model
+    is only rewritten when it changes.
+    """
+    model = load_model(username)
+    ledger_tags = _first_tags(ledger_df)
+    is_tagged = (ledger_tags != '').to_numpy()
+    fingerprints = _fingerprints(ledger_df[is_tagged])
+    if not np.isin(model['trained'], fingerprints).all():
+        model = _empty_model()
+    is_new = ~np.isin(fingerprints, model['trained'])
+    if not is_new.any():
+        return model
+    new_rows = ledger_df[is_tagged][is_new]
+    tags = _first_tags(new_rows).to_numpy(dtype=str)
+    labels = np.union1d(model['labels'], tags)
+    previous = np.searchsorted(labels, model['labels'])
+    counts = np.zeros((len(labels), N_FEATURES), dtype=np.int32)
+    counts[previous] = model['counts']
+    doc_counts = np.zeros(len(labels), dtype=np.int32)
+    doc_counts[previous] = model['doc_counts']
+    payees = _payees(new_rows)
+    label_ids = np.searchsorted(labels, tags)
+    np.add.at(doc_counts, label_ids, 1)
+    for label_id, payee in zip(label_ids, payees):
+        np.add.at(counts[label_id], _features(payee), 1)
+    lookup = pd.Series(model['payee_tags'], index=model['payees'], dtype=object)
+    recent = pd.Series(tags, index=payees.to_numpy(), dtype=object)
+    lookup = pd.concat([lookup, recent])
+    lookup = lookup[~lookup.index.duplicated(keep='last')]
+    model.update({
+        'labels': labels,
+        'counts': counts,
+        'doc_counts': doc_counts,
+        'payees': lookup.index.to_numpy(dtype=str),
+        'payee_tags': lookup.to_numpy(dtype=str),
+        'trained': np.concatenate([model['trained'], fingerprints[is_new]]),
+    })
+    save_model(username, model)
+    return model
+
+def lookup_tags(model, df):
+    """Returns the tag last used for each row's exact payee, or '' for payees never tagged before."""
+    lookup = pd.Series(model['payee_tags'], index=model['payees'], dtype=object)
+    return _payees(df).map(lookup).fillna('').astype(object).rename('tags')
+
+def predict_tags(model, df, min_confidence=MIN_CONFIDENCE):
+    """Suggests a tag for each row of `df` in batch; rows below `min_confidence` get ''.
+
+    Exact payee matches come from `lookup_tags`; other payees get the classifier's guess, which is
+    only meant as a suggestion to show the user, not to be written to the ledger unreviewed.
+    """
+    predictions = pd.Series('', index=df.index, dtype=object, name='tags')
+    if df.empty or len(model['labels']) == 0:
+        return predictions
+    payees = _payees(df)
+    known = lookup_tags(model, df).replace('', np.nan)
+
+    unknown = known.isna().to_numpy()
+    if unknown.any():
+        log_prob = np.log(model['counts'] + 1) - np.log(model['counts'].sum(axis=1, keepdims=True) + N_FEATURES)
+        log_prior = np.log(model['doc_counts'] + 1) - np.log(model['doc_counts'].sum() + len(model['labels']))
+        features = [_features(payee) for payee in payees[unknown]]
+        row_ids = np.repeat(np.arange(len(features)), [len(f) for f in features])
+        feature_ids = np.fromiter((i for f in features for i in f), dtype=np.int64, count=row_ids.size)
+        scores = np.tile(log_prior, (len(features), 1))
+        np.add.at(scores, row_ids, log_prob[:, feature_ids].T)
+        scores -= scores.max(axis=1, keepdims=True)
+        posterior = np.exp(scores)
+        posterior /= posterior.sum(axis=1, keepdims=True)
+        best = posterior.argmax(axis=1)
+        confident = posterior[np.arange(len(best)), best] >= min_confidence
+        known.iloc[np.flatnonzero(unknown)] = np.where(confident, model['labels'][best], '')
+    return known.fillna('').astype(object).rename('tags')
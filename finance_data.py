@@ -1,17 +1,25 @@
 import plotly as py
 import streamlit as st
-from utils import add_transaction, view_transaction
+from utils import add_transaction, view_transaction, report_writes
 from summary import summary
 from budget import budget 
 from portfolio import portfolio
 from addbankstatement_ import add_bank_statement
+from ledger import cache_memory_usage
+from fx import available_currencies, load_fx_rates
 def moneymanager():
     st.markdown("---")
+    report_writes()
     menu = st.sidebar.selectbox(
         "Navigation",
         ["Add Transaction", "View Transactions", "Summary", 
          "Budget","Portfolio","Add Bank Statement", "Help & support"]
     )
+    st.session_state.reporting_currency = st.sidebar.selectbox(
+        "Reporting Currency", available_currencies(load_fx_rates()[0])
+    )
+    cached_ledgers, cached_bytes = cache_memory_usage()
+    st.sidebar.caption(f"Cached ledgers: {cached_ledgers} ({cached_bytes / 1024:,.1f} KB)")
     if menu == "Add Transaction":
         add_transaction()
     elif menu == "View Transactions":
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from budget_engine import map_tag_categories, spend_by_period
+from ledger import compact_ledger, load_ledger_in, with_amounts
+import write_queue
+
+STATE_COLUMNS = ['year', 'month', 'category', 'spent']
+VERSION_COLUMNS = ['ledger_version', 'mapping_version']
+TAG_MAPPING_FILE = os.path.join("data", "tag_mapping.csv")
+
+def spend_state_path(username):
+    """Returns the path of the per-user monthly spend state used for forecasting."""
+    return os.path.join("data", username, "spend_state.csv")
+
+def _monthly_spend(ledger, tag_mapping):
+    """Sums expense amounts of ledger rows, in the base currency, per (year, month, category)."""
+    ledger = ledger.dropna(subset=['date'])
+    return spend_by_period(map_tag_categories(ledger, tag_mapping))
+
+def _state_frame(state, ledger_version, mapping_version):
+    state_df = state.rename('spent').reset_index()[STATE_COLUMNS]
+    return state_df.assign(ledger_version=ledger_version, mapping_version=mapping_version)
+
+def _state_versions(state_df):
+    if state_df.empty or not set(VERSION_COLUMNS) <= set(state_df.columns):
+        return None
+    return tuple(state_df[VERSION_COLUMNS].iloc[0].astype(str))
+
+def load_spend_state(username, user_file, tag_mapping, tag_mapping_file=TAG_MAPPING_FILE):
+    """Loads the monthly spend state of a user, rebuilding it from the ledger at `user_file` when stale.
+
+    The state records the versions of the ledger and tag mapping it was built from and is rebuilt
+    when either file has changed since, e.g. after an edit outside the app or a failed write.
+    """
+    state_file = spend_state_path(username)
+    pending = write_queue.has_pending_writes(user_file) or write_queue.has_pending_writes(tag_mapping_file)
+    versions = (write_queue.file_version(user_file), write_queue.file_version(tag_mapping_file))
+    if not pending and write_queue.exists(state_file):
+        state_df = write_queue.read_csv(state_file)
+        if _state_versions(state_df) == versions:
+            return state_df.set_index(['year', 'month', 'category'])['spent']
+    state = _monthly_spend(load_ledger_in(user_file), tag_mapping)
+    if not pending:
+        write_queue.replace_csv(state_file, _state_frame(state, *versions))
+    return state
+
+def record_transactions(username, new_rows, tag_mapping, ledger_write):
+    """Adds ledger rows to the spend state without rescanning the ledger once `ledger_write` succeeds.
+
+    Does nothing until the state has been built; the first build reads the full ledger anyway.
+    The rows are added by the write queue to the state as it is when written, so concurrent
+    sessions do not overwrite each other's additions.
+    """
+    state_file = spend_state_path(username)
+    if not write_queue.exists(state_file):
+        return
+    added = _monthly_spend(with_amounts(compact_ledger(new_rows)), tag_mapping)
+
+    def _add_rows(state_df, ledger_version):
+        # Skip if the state is missing or was already rebuilt from the ledger including these rows.
+        versions = None if state_df is None else _state_versions(state_df)
+        if state_df is None or (versions is not None and versions[0] == ledger_version):
+            return None
+        state = state_df.set_index(['year', 'month', 'category'])['spent']
+        mapping_version = versions[1] if versions is not None else ''
+        return _state_frame(state.add(added, fill_value=0).sort_index(), ledger_version, mapping_version)
+
+    def _on_written(future):
+        if future.exception() is None:
+            ledger_version = write_queue.file_version(future.result())
+            write_queue.update_csv(state_file, lambda state_df: _add_rows(state_df, ledger_version))
+
+    ledger_write.add_done_callback(_on_written)
+
+def forecast_month_end(state, today=None, span=3):
+    """Projects month-end spend per category from the current burn rate and seasonal history.
+
+    The rest of the month is estimated from a blend of the month-to-date burn rate and an EWMA
+    of previous monthly totals; the burn rate gains weight as the month progresses.
+    """
+    today = pd.Timestamp.today() if today is None else pd.Timestamp(today)
+    days_in_month = today.days_in_month
+    elapsed = today.day / days_in_month
+    columns = ['Category', 'Spent', 'Burn Rate', 'History', 'Projected']
+    if state.empty:
+        return pd.DataFrame(columns=columns)
+    monthly = state.unstack('category', fill_value=0.0)
+    current_key = (today.year, today.month)
+    spent = monthly.loc[current_key] if current_key in monthly.index else pd.Series(0.0, index=monthly.columns)
+    history = monthly[monthly.index < current_key]
+    if history.empty:
+        history_ewma = pd.Series(np.nan, index=monthly.columns)
+    else:
+        history_ewma = history.ewm(span=span).mean().iloc[-1]
+    burn_projection = spent / elapsed
+    expected_total = (elapsed * burn_projection + (1 - elapsed) * history_ewma).fillna(burn_projection)
+    projected = spent + (1 - elapsed) * expected_total
+    forecast = pd.DataFrame({
+        'Category': monthly.columns.to_numpy(),
+        'Spent': spent.to_numpy(dtype=float),
+        'Burn Rate': (spent / today.day).to_numpy(dtype=float),
+        'History': history_ewma.to_numpy(dtype=float),
+        'Projected': projected.to_numpy(dtype=float),
+    })
+    return forecast[(forecast['Spent'] > 0) | (forecast['History'] > 0)].reset_index(drop=True)
+
+def projected_overruns(forecast, budgets):
+    """Returns the forecast rows whose projected spend exceeds a set budget."""
+    budget_values = forecast['Category'].map(budgets).fillna(0.0)
+    overruns = forecast.assign(Budget=budget_values)
+    return overruns[(overruns['Budget'] > 0) & (overruns['Projected'] > overruns['Budget'])]
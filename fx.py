@@ -0,0 +1,82 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCY = "INR"
+FX_RATES_FILE = os.path.join("data", "fx_rates.csv")
+RATE_TOLERANCE = pd.Timedelta(days=7)
+CURRENCY_SYMBOLS = {'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥'}
+
+_rates_cache = {}
+_rates_cache_lock = threading.Lock()
+
+def currency_symbol(currency):
+    """Returns the display symbol of a currency code, or the code itself."""
+    return CURRENCY_SYMBOLS.get(currency, f"{currency} ")
+
+def load_fx_rates(rates_file=FX_RATES_FILE):
+    """Loads the local FX rate table and its version.
+
+    Each row gives `rate`, the amount of BASE_CURRENCY one unit of `currency` buys on `date`.
+    The table is cached until the file changes.
+    """
+    if not os.path.exists(rates_file):
+        return pd.DataFrame({'date': pd.Series(dtype='datetime64[ns]'), 'currency': pd.Series(dtype=str), 'rate': pd.Series(dtype=float)}), None
+    stat = os.stat(rates_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _rates_cache_lock:
+        cached = _rates_cache.get(rates_file)
+    if cached is not None and cached[0] == version:
+        return cached[1], version
+    rates = pd.read_csv(rates_file)
+    rates['date'] = pd.to_datetime(rates['date'], errors='coerce').astype('datetime64[ns]')
+    rates['currency'] = rates['currency'].astype(str).str.strip().str.upper()
+    rates['rate'] = pd.to_numeric(rates['rate'], errors='coerce')
+    rates = rates.dropna().sort_values('date', kind='stable').reset_index(drop=True)
+    with _rates_cache_lock:
+        _rates_cache[rates_file] = (version, rates)
+    return rates, version
+
+def available_currencies(rates):
+    """Returns the reporting currencies the rate table can convert to."""
+    return [BASE_CURRENCY] + sorted(set(rates['currency']) - {BASE_CURRENCY})
+
+def _rates_for(dates, currencies, rates):
+    """Looks up the rate of each (date, currency) pair with one as-of join on the latest rate on or before the date.
+
+    Rates older than RATE_TOLERANCE are not used; those rows come back as NaN.
+    """
+    lookup = pd.DataFrame({
+        'date': dates.astype('datetime64[ns]').to_numpy(),
+        'currency': currencies.astype(str).str.upper().to_numpy(),
+        'row': np.arange(len(dates)),
+    })
+    result = np.where(lookup['currency'] == BASE_CURRENCY, 1.0, np.nan)
+    foreign = lookup[(lookup['currency'] != BASE_CURRENCY) & lookup['date'].notna()]
+    if not foreign.empty and not rates.empty:
+        merged = pd.merge_asof(
+            foreign.sort_values('date', kind='stable'),
+            rates,
+            on='date',
+            by='currency',
+            direction='backward',
+            tolerance=RATE_TOLERANCE
+        )
+        result[merged['row'].to_numpy()] = merged['rate'].to_numpy()
+    return result
+
+def convert_amounts(ledger, currency=BASE_CURRENCY, rates=None):
+    """Converts the paise amounts of a compact ledger to `currency` as a float Series.
+
+    Rows whose currency has no rate in the table come back as NaN.
+    """
+    if rates is None:
+        rates, _ = load_fx_rates()
+    amount = ledger['amount_paise'].to_numpy() / 100
+    to_base = _rates_for(ledger['date'], ledger['currency'], rates)
+    converted = amount * to_base
+    if currency != BASE_CURRENCY:
+        reporting = pd.Series(currency, index=ledger.index)
+        converted = converted / _rates_for(ledger['date'], reporting, rates)
+    return pd.Series(converted, index=ledger.index, name='amount')
@@ -0,0 +1,157 @@
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+from periods import period_keys
+import write_queue
+from fx import BASE_CURRENCY, convert_amounts, load_fx_rates
+from statement_parser import extract_account_fields
+
+LEDGER_COLUMNS = [
+    'date', 'Account Name', 'description', 'amount', 'category', 'type', 'payment_method', 'tags',
+    'account', 'currency', 'channel', 'reference'
+]
+CATEGORICAL_COLUMNS = ['Account Name', 'category', 'type', 'payment_method', 'tags', 'account', 'currency', 'channel']
+DEFAULT_ACCOUNT = "Primary"
+MAX_CACHED_LEDGERS = 16
+MAX_CACHED_AMOUNTS = 32
+
+_ledger_cache = OrderedDict()
+_ledger_cache_lock = threading.Lock()
+_amount_cache = OrderedDict()
+
+def _cache_get(cache, key):
+    """Returns a cached entry and marks it most recently used; the cache lock must be held."""
+    entry = cache.get(key)
+    if entry is not None:
+        cache.move_to_end(key)
+    return entry
+
+def _cache_put(cache, key, entry, max_entries):
+    """Stores an entry and evicts the least recently used ones beyond `max_entries`.
+
+    The cache lock must be held.
+    """
+    cache[key] = entry
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+
+def compact_ledger(df):
+    """Converts a raw ledger frame to the compact in-memory format.
+
+    Low-cardinality text columns become categoricals, the date is split into integer `year`,
+    `month` and `period` codes and amounts are stored as integer paise in `amount_paise`.
+    Ledgers written before accounts and currencies existed get the default account and INR.
+    Rows are sorted by date so that period ranges can be sliced with `periods.slice_periods`.
+    """
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    df = df.sort_values('date', kind='stable', na_position='last').reset_index(drop=True)
+    df['year'] = df['date'].dt.year.astype('Int16')
+    df['month'] = df['date'].dt.month.astype('Int8')
+    df['period'] = period_keys(df['date'])
+    amount = pd.to_numeric(df.pop('amount'), errors='coerce').fillna(0)
+    df['amount_paise'] = (amount * 100).round().astype('int64')
+    df['account'] = df['account'].fillna(DEFAULT_ACCOUNT) if 'account' in df.columns else DEFAULT_ACCOUNT
+    df['currency'] = df['currency'].fillna(BASE_CURRENCY) if 'currency' in df.columns else BASE_CURRENCY
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return df
+
+def _load_versioned(user_file):
+    """Returns the (mtime, size) version of a ledger file and its compact form.
+
+    The version is None while writes to the file are queued, as the result is not cached then.
+    """
+    if write_queue.has_pending_writes(user_file):
+        return None, compact_ledger(write_queue.read_csv(user_file, dtype={'reference': str}))
+    stat = os.stat(user_file)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _ledger_cache_lock:
+        cached = _cache_get(_ledger_cache, user_file)
+    if cached is not None and cached[0] == version:
+        return cached
+    ledger = compact_ledger(pd.read_csv(user_file, dtype={'reference': str}))
+    with _ledger_cache_lock:
+        _cache_put(_ledger_cache, user_file, (version, ledger), MAX_CACHED_LEDGERS)
+        for key in [key for key in _amount_cache if key[0] == user_file]:
+            del _amount_cache[key]
+    return version, ledger
+
+def load_ledger(user_file):
+    """Loads a ledger in compact form, reusing the cached copy until the file changes.
+
+    At most MAX_CACHED_LEDGERS ledgers are cached; the least recently used one is evicted first.
+    The cached frame is shared between sessions; derive new frames from it instead of mutating it.
+    While writes to the file are still queued the ledger is rebuilt with them and not cached.
+    """
+    return _load_versioned(user_file)[1]
+
+def with_amounts(ledger, currency=BASE_CURRENCY):
+    """Returns a working copy of a compact ledger with a float `amount` column in `currency`."""
+    return ledger.assign(amount=convert_amounts(ledger, currency))
+
+def load_ledger_in(user_file, currency=BASE_CURRENCY):
+    """Loads a working copy of a ledger with `amount` converted to the reporting `currency`.
+
+    Converted amounts are cached per ledger and reporting currency until the ledger or the
+    FX rate table changes, so switching currencies does not redo the join on every render.
+    """
+    version, ledger = _load_versioned(user_file)
+    rates, rates_version = load_fx_rates()
+    if version is None:
+        return ledger.assign(amount=convert_amounts(ledger, currency, rates))
+    key = (user_file, currency)
+    with _ledger_cache_lock:
+        cached = _cache_get(_amount_cache, key)
+    if cached is not None and cached[0] == version and cached[1] == rates_version:
+        amount = cached[2]
+    else:
+        amount = convert_amounts(ledger, currency, rates)
+        with _ledger_cache_lock:
+            _cache_put(_amount_cache, key, (version, rates_version, amount), MAX_CACHED_AMOUNTS)
+    return ledger.assign(amount=amount)
+
+def _add_missing_columns(df):
+    if df is None or set(LEDGER_COLUMNS) <= set(df.columns):
+        return None
+    df = df.copy()
+    if 'account' not in df.columns:
+        df['account'] = DEFAULT_ACCOUNT
+    if 'currency' not in df.columns:
+        df['currency'] = BASE_CURRENCY
+    if 'channel' not in df.columns or 'reference' not in df.columns:
+        fields = extract_account_fields(df['description'])
+        df['channel'] = df['channel'] if 'channel' in df.columns else fields['channel']
+        df['reference'] = df['reference'] if 'reference' in df.columns else fields['reference']
+    return df
+
+def ensure_ledger_columns(user_file):
+    """Adds the columns of LEDGER_COLUMNS missing from a ledger file written before they existed.
+
+    Missing `channel` and `reference` columns are backfilled by parsing the stored descriptions
+    once. The columns are added by the write queue to the file as it is when written, so rows
+    appended by other sessions in the meantime are kept.
+    """
+    columns = write_queue.read_csv(user_file, nrows=0).columns
+    if set(LEDGER_COLUMNS) <= set(columns):
+        return None
+    return write_queue.update_csv(user_file, _add_missing_columns)
+
+def ledger_memory_usage(ledger):
+    """Returns the deep memory footprint of a ledger frame in bytes."""
+    return int(ledger.memory_usage(deep=True).sum())
+
+def cache_memory_usage():
+    """Returns the number of cached ledgers and their combined memory footprint in bytes.
+
+    The footprint includes the converted amount columns cached per reporting currency.
+    """
+    with _ledger_cache_lock:
+        ledgers = [ledger for _, ledger in _ledger_cache.values()]
+        amounts = [amount for _, _, amount in _amount_cache.values()]
+    total = sum(ledger_memory_usage(ledger) for ledger in ledgers)
+    total += sum(int(amount.memory_usage(deep=True)) for amount in amounts)
+    return len(ledgers), total
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import os
 from finance_data import moneymanager
+from ledger import LEDGER_COLUMNS
 
 if 'login_username' not in st.session_state:
     st.session_state.login_username = ""
@@ -48,7 +49,7 @@ def create_user_file(username):
     user_file = os.path.join(user_dir, "data.csv")
     try:
         if not os.path.exists(user_file):
-            df = pd.DataFrame(columns=['date','Account Name', 'description', 'amount', 'category', 'type', 'payment_method', 'tags',])
+            df = pd.DataFrame(columns=LEDGER_COLUMNS)
             df.to_csv(user_file, index=False)
         return user_file
     except Exception as e:
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+NO_PERIOD = np.iinfo(np.int32).max
+
+def period_key(year, month):
+    """Returns the integer period key year * 12 + (month - 1) of a calendar month."""
+    return int(year) * 12 + int(month) - 1
+
+def period_year_month(key):
+    """Splits an integer period key back into (year, month)."""
+    return key // 12, key % 12 + 1
+
+def period_label(key):
+    """Formats an integer period key as 'January 2025'."""
+    year, month = period_year_month(key)
+    return f"{MONTH_NAMES[month - 1]} {year}"
+
+def current_period():
+    """Returns the period key of today's month."""
+    today = pd.Timestamp.today()
+    return period_key(today.year, today.month)
+
+def period_keys(dates):
+    """Computes int32 period keys for a datetime Series; missing dates get NO_PERIOD so they sort last."""
+    keys = dates.dt.year * 12 + dates.dt.month - 1
+    return keys.fillna(NO_PERIOD).astype(np.int32)
+
+def period_start(keys):
+    """Converts a Series of period keys to month-start timestamps; NO_PERIOD becomes NaT."""
+    keys = keys.where(keys != NO_PERIOD)
+    return pd.to_datetime(pd.DataFrame({'year': keys // 12, 'month': keys % 12 + 1, 'day': 1}))
+
+def slice_periods(ledger, start, end=None):
+    """Returns the rows of a period-sorted ledger with start <= period <= end using binary search."""
+    end = start if end is None else end
+    periods = ledger['period'].to_numpy()
+    lo = np.searchsorted(periods, start, side='left')
+    hi = np.searchsorted(periods, end, side='right')
+    return ledger.iloc[lo:hi]
+
+def slice_year(ledger, year):
+    """Returns the rows of a period-sorted ledger that fall in `year`."""
+    return slice_periods(ledger, period_key(year, 1), period_key(year, 12))
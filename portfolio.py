@@ -5,6 +5,13 @@ import plotly.express as px
 import csv
 import os
 from utils import check_and_initialize_user_data
+from budget_engine import map_tag_categories, spend_by_period
+from budget_store import load_budget_store, budget_vs_actual
+from recurring import detect_recurring, load_recurring, save_recurring, upcoming_charges
+from ledger import load_ledger_in
+from fx import BASE_CURRENCY, currency_symbol
+from periods import period_start
+import write_queue
 def portfolio():
     st.markdown("<h3 style='color: white;'>Portfolio Overview</h3>", unsafe_allow_html=True)
     username = st.session_state.get("login_username", "")
@@ -23,30 +30,44 @@ def portfolio():
         return
 
     try:
-        df = pd.read_csv(user_file)
-        if df.empty:
+        currency = st.session_state.get("reporting_currency", BASE_CURRENCY)
+        symbol = currency_symbol(currency)
+        base_df = load_ledger_in(user_file)
+        if base_df.empty:
             st.warning("No transactions available for this user. Please add transactions to view the portfolio.")
             return
 
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['month'] = df['date'].dt.strftime('%B')
-        df['year'] = df['date'].dt.year
-        df['tags'] = df['tags'].str.split(',')
+        recurring = load_recurring(username, user_file)
+        if recurring is None or st.button("Refresh Recurring Payments"):
+            recurring = detect_recurring(base_df)
+            save_recurring(username, user_file, recurring)
 
-        tag_mapping_df = pd.read_csv(tag_mapping_file)
+        df = base_df if currency == BASE_CURRENCY else load_ledger_in(user_file, currency)
+        missing_rates = int(df['amount'].isna().sum())
+        if missing_rates:
+            st.warning(f"{missing_rates} transactions have no FX rate to {currency} and are left out.")
+            df = df.dropna(subset=['amount'])
+
+        tag_mapping_df = write_queue.read_csv(tag_mapping_file)
         tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
-        df = df.explode('tags')
-        df['tags'] = df['tags'].str.strip().str.lower()
-        df['category'] = df['tags'].map(tag_mapping).fillna('Uncategorized')
+        df = map_tag_categories(df, tag_mapping)
         total_spent = df[df['category'] != 'Income']['amount'].sum()
         total_income = df[df['category'] == 'Income']['amount'].sum()
         savings = total_income - total_spent
 
         # Display summary
         st.write("### Summary")
-        st.metric("Total Income", f"₹{total_income:,.2f}")
-        st.metric("Total Spent", f"₹{total_spent:,.2f}")
-        st.metric("Savings", f"₹{savings:,.2f}")
+        st.metric("Total Income", f"{symbol}{total_income:,.2f}")
+        st.metric("Total Spent", f"{symbol}{total_spent:,.2f}")
+        st.metric("Savings", f"{symbol}{savings:,.2f}")
+
+        # Consolidated view across accounts
+        if df['account'].nunique() > 1:
+            st.write("### Accounts")
+            signed = df['amount'].where(df['category'] == 'Income', -df['amount'])
+            account_totals = signed.groupby(df['account'], observed=True).sum().reset_index(name='net')
+            account_totals['net'] = account_totals['net'].map(lambda x: f"{symbol}{x:,.2f}")
+            st.table(account_totals.rename(columns={'account': 'Account', 'net': f'Net ({currency})'}))
 
         # Spending distribution by category
         st.write("### Spending Distribution by Category")
@@ -58,22 +79,22 @@ def portfolio():
             title="Spending Distribution",
             hole=0.5
         )
-        fig.update_traces(hovertemplate='%{label}: ₹%{value:,.2f}<extra></extra>')
+        fig.update_traces(hovertemplate=f'%{{label}}: {symbol}%{{value:,.2f}}<extra></extra>')
         st.plotly_chart(fig)
 
         # Spending trends over time
         st.write("### Spending Trends")
-        df['month_year'] = df['date'].dt.to_period('M').dt.to_timestamp()
+        df['month_year'] = period_start(df['period'])
         spending_trends = df[df['category'] != 'Income'].groupby('month_year')['amount'].sum().reset_index()
         fig = px.line(
             spending_trends,
             x='month_year',
             y='amount',
             title="Monthly Spending Trends",
-            labels={'amount': 'Spent (₹)', 'month_year': 'Month'},
+            labels={'amount': f'Spent ({currency})', 'month_year': 'Month'},
             markers=True
         )
-        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title="Amount Spent (₹)"))
+        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title=f"Amount Spent ({currency})"))
         st.plotly_chart(fig)
 
         # Savings trends over time
@@ -88,11 +109,11 @@ def portfolio():
             x='month_year',
             y='savings',
             title="Monthly Savings Trends",
-            labels={'savings': 'Savings (₹)', 'month_year': 'Month'},
+            labels={'savings': f'Savings ({currency})', 'month_year': 'Month'},
             color='savings',
             color_continuous_scale=['red', 'green'],
         )
-        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title="Savings (₹)"))
+        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title=f"Savings ({currency})"))
         st.plotly_chart(fig)
 
         # Spending breakdown by individual categories
@@ -104,10 +125,37 @@ def portfolio():
             y='amount',
             color='category',
             title="Spending Breakdown by Category",
-            labels={'amount': 'Spent (₹)', 'month_year': 'Month'},
+            labels={'amount': f'Spent ({currency})', 'month_year': 'Month'},
         )
-        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title="Amount Spent (₹)"))
+        fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title=f"Amount Spent ({currency})"))
         st.plotly_chart(fig)
 
+        # Budget vs actual over time
+        budgets = load_budget_store(username)
+        if not budgets.empty:
+            st.write("### Budget vs Actual")
+            # Budgets are set in the base currency.
+            base_spent = spend_by_period(df if currency == BASE_CURRENCY else map_tag_categories(base_df, tag_mapping))
+            history = budget_vs_actual(budgets, base_spent)
+            history = history[history['budget'] > 0]
+            fig = px.line(
+                history,
+                x='period',
+                y=['budget', 'actual'],
+                title="Monthly Budget vs Actual Spending",
+                labels={'value': 'Amount (₹)', 'period': 'Month', 'variable': ''},
+                markers=True
+            )
+            fig.update_layout(xaxis=dict(title="Month"), yaxis=dict(title="Amount (₹)"))
+            st.plotly_chart(fig)
+
+        # Upcoming recurring charges
+        st.write("### Upcoming Expected Charges")
+        upcoming = upcoming_charges(recurring)
+        if upcoming.empty:
+            st.info("No recurring charges expected in the next 30 days.")
+        else:
+            st.table(upcoming)
+
     except Exception as e:
         st.error(f"Error processing portfolio: {str(e)}")
@@ -0,0 +1,148 @@
+import os
+import numpy as np
+import pandas as pd
+from ledger import load_ledger_in
+import write_queue
+
+RECURRING_COLUMNS = [
+    'payee', 'amount', 'frequency', 'interval_days', 'occurrences', 'last_date', 'next_expected'
+]
+# (label, target interval in days, allowed deviation of the interval in days, minimum occurrences)
+FREQUENCIES = [
+    ('Weekly', 7, 1, 6),
+    ('Monthly', 30, 3, 3),
+    ('Quarterly', 91, 7, 3),
+    ('Yearly', 365, 15, 3),
+]
+
+def recurring_path(username):
+    """Returns the path of the detected recurring payments of a user."""
+    return os.path.join("data", username, "recurring.csv")
+
+def _match_frequency(interval_days):
+    """Returns the index into FREQUENCIES whose target is within tolerance of each interval, or -1."""
+    targets = np.array([days for _, days, _, _ in FREQUENCIES])
+    tolerances = np.array([tolerance for _, _, tolerance, _ in FREQUENCIES])
+    deviation = np.abs(interval_days[:, None] - targets[None, :])
+    nearest = deviation.argmin(axis=1)
+    within = deviation[np.arange(len(nearest)), nearest] <= tolerances[nearest]
+    return np.where(within, nearest, -1)
+
+def detect_recurring(df, amount_tolerance=0.1, max_interval_cv=0.35, min_occurrences=3, max_missed=2, today=None):
+    """Finds recurring payments: same payee, similar amount and a regular interval.
+
+    The median interval, and the spread of the intervals, must lie within the tolerance of one
+    of FREQUENCIES, which also sets how many payments are needed; series that have missed more
+    than `max_missed` payments by `today` are dropped as ended. Payments are grouped with sorts
+    and cumulative sums instead of per-payee loops, so the whole ledger is processed in
+    O(n log n).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=RECURRING_COLUMNS)
+    payments = pd.DataFrame({
+        'payee': df['Account Name'].astype(str).str.strip().str.upper(),
+        'amount': pd.to_numeric(df['amount'], errors='coerce'),
+        'date': pd.to_datetime(df['date'], errors='coerce'),
+    })
+    if 'category' in df.columns:
+        payments = payments[df['category'] != 'Income']
+    payments = payments[(payments['amount'] > 0) & payments['date'].notna()]
+    payments = payments[~payments['payee'].isin(['', 'NAN', 'UNKNOWN'])]
+    if payments.empty:
+        return pd.DataFrame(columns=RECURRING_COLUMNS)
+
+    # Split each payee's payments into clusters of similar amounts; clusters that chain across a
+    # wide range of amounts are rejected below.
+    payments = payments.sort_values(['payee', 'amount'], kind='mergesort')
+    new_payee = payments['payee'].ne(payments['payee'].shift())
+    jump = payments['amount'] > payments['amount'].shift() * (1 + amount_tolerance)
+    payments['cluster'] = (new_payee | jump).cumsum()
+
+    # Interval statistics per cluster in date order.
+    payments = payments.sort_values(['cluster', 'date'], kind='mergesort')
+    same_cluster = payments['cluster'].eq(payments['cluster'].shift())
+    payments['interval'] = payments['date'].diff().dt.days.where(same_cluster)
+    grouped = payments.groupby('cluster')
+    stats = pd.DataFrame({
+        'payee': grouped['payee'].first(),
+        'amount': grouped['amount'].median(),
+        'amount_spread': grouped['amount'].max() - grouped['amount'].min(),
+        'occurrences': grouped['date'].size(),
+        'last_date': grouped['date'].max(),
+        'interval_days': grouped['interval'].median(),
+        'interval_std': grouped['interval'].std(ddof=0),
+    })
+    frequency = _match_frequency(stats['interval_days'].fillna(0).to_numpy())
+    required = np.array([max(min_occurrences, count) for _, _, _, count in FREQUENCIES])[frequency]
+    tolerance = np.array([tolerance for _, _, tolerance, _ in FREQUENCIES])[frequency]
+    regular = (
+        (frequency >= 0)
+        & (stats['amount_spread'] <= stats['amount'] * 2 * amount_tolerance)
+        & (stats['occurrences'] >= required)
+        & (stats['interval_std'] <= np.minimum(stats['interval_days'] * max_interval_cv, tolerance))
+    )
+    stats['frequency'] = np.array([label for label, _, _, _ in FREQUENCIES])[frequency]
+    stats = stats[regular].copy()
+    if stats.empty:
+        return pd.DataFrame(columns=RECURRING_COLUMNS)
+    interval = pd.to_timedelta(stats['interval_days'], unit='D')
+    stats['next_expected'] = stats['last_date'] + interval
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    stats = stats[stats['next_expected'] + max_missed * interval >= today].copy()
+    if stats.empty:
+        return pd.DataFrame(columns=RECURRING_COLUMNS)
+    stats['last_date'] = stats['last_date'].dt.date
+    stats['next_expected'] = stats['next_expected'].dt.date
+    return stats[RECURRING_COLUMNS].sort_values('next_expected').reset_index(drop=True)
+
+def save_recurring(username, user_file, recurring):
+    """Queues recurring payments detected on the ledger at `user_file` to be saved for the dashboards.
+
+    The results are stamped with the version of the ledger they were detected on. Nothing is
+    saved while writes to the ledger are queued, as the version on disk does not match them yet.
+    Returns the write's Future, or None if nothing was queued.
+    """
+    if write_queue.has_pending_writes(user_file):
+        return None
+    recurring = recurring.assign(ledger_version=write_queue.file_version(user_file))
+    return write_queue.replace_csv(recurring_path(username), recurring)
+
+def load_recurring(username, user_file):
+    """Loads the persisted recurring payments of a user, or None if they are missing or stale.
+
+    Results are stale once the ledger at `user_file` has changed since they were detected.
+    """
+    recurring_file = recurring_path(username)
+    if write_queue.has_pending_writes(user_file) or not write_queue.exists(recurring_file):
+        return None
+    recurring = write_queue.read_csv(recurring_file)
+    if recurring.empty or 'ledger_version' not in recurring.columns:
+        return None
+    if (recurring['ledger_version'].astype(str) != write_queue.file_version(user_file)).any():
+        return None
+    recurring = recurring[RECURRING_COLUMNS].copy()
+    recurring['last_date'] = pd.to_datetime(recurring['last_date'])
+    recurring['next_expected'] = pd.to_datetime(recurring['next_expected'])
+    return recurring
+
+def upcoming_charges(recurring, today=None, days=30):
+    """Returns recurring payments expected within the next `days` days."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    next_expected = pd.to_datetime(recurring['next_expected'])
+    return recurring[(next_expected >= today) & (next_expected <= today + pd.Timedelta(days=days))]
+
+def detect_recurring_for_all_users(users_file="data/users.csv"):
+    """Runs detection over every user's ledger in batch and persists the results."""
+    results = {}
+    for username in pd.read_csv(users_file)['username']:
+        user_file = os.path.join("data", username, f"{username}_data.csv")
+        if not os.path.exists(user_file):
+            continue
+        recurring = detect_recurring(load_ledger_in(user_file))
+        save_recurring(username, user_file, recurring)
+        results[username] = len(recurring)
+    return results
+
+if __name__ == "__main__":
+    for username, count in detect_recurring_for_all_users().items():
+        print(f"{username}: {count} recurring payments")
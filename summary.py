@@ -2,10 +2,14 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from utils import check_and_initialize_user_data
+from periods import MONTH_NAMES, slice_year
+from ledger import load_ledger_in
+from fx import BASE_CURRENCY, currency_symbol
+import write_queue
 
-def format_amount(amount):
+def format_amount(amount, symbol='₹'):
     """Formats the amount in Indian numbering style."""
-    return '₹{:,.0f}'.format(amount).replace(',', 'X').replace('X', ',', 1) 
+    return (symbol + '{:,.0f}').format(amount).replace(',', 'X').replace('X', ',', 1) 
 
 def summary():
     st.markdown("<h3 style='color: white;'>Summary</h3>", unsafe_allow_html=True)
@@ -18,22 +22,22 @@ def summary():
         st.warning("No file uploaded.")
         return
     try:
-        df = pd.read_csv(user_file)
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0)
-        df['month'] = df['date'].dt.strftime('%B')
-        df['year'] = df['date'].dt.year
+        currency = st.session_state.get("reporting_currency", BASE_CURRENCY)
+        symbol = currency_symbol(currency)
+        df = load_ledger_in(user_file, currency)
+        missing_rates = int(df['amount'].isna().sum())
+        if missing_rates:
+            st.warning(f"{missing_rates} transactions have no FX rate to {currency} and are left out.")
+            df = df.dropna(subset=['amount'])
         years = sorted(df['year'].dropna().astype(int).unique())
         if not years:
             st.warning("No data available")
             return
         selected_year = st.selectbox("Select Year", years, index=len(years) - 1)
-        yearly_df = df[df['year'] == selected_year]
-        monthly_totals = yearly_df.groupby('month')['amount'].sum().reindex([
-            'January', 'February', 'March', 'April', 'May', 'June',
-            'July', 'August', 'September', 'October', 'November', 'December'
-        ]).fillna(0)
-        formatted_amounts = monthly_totals.apply(format_amount)
+        yearly_df = slice_year(df, selected_year)
+        monthly_totals = yearly_df.groupby('month')['amount'].sum().reindex(range(1, 13)).fillna(0)
+        monthly_totals.index = MONTH_NAMES
+        formatted_amounts = monthly_totals.apply(format_amount, symbol=symbol)
         plot_df = pd.DataFrame({
             'Month': monthly_totals.index,
             'Amount': monthly_totals.values
@@ -80,7 +84,7 @@ def summary():
         )
         st.plotly_chart(fig)
         try:
-            tag_mapping_df = pd.read_csv("data/tag_mapping.csv")
+            tag_mapping_df = write_queue.read_csv("data/tag_mapping.csv")
             tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
         except Exception as e:
             st.error("Failed to load tag mapping from CSV.")
@@ -94,13 +98,13 @@ def summary():
             
             tag_df = pd.DataFrame({
                 'Category': category_totals.index,
-                'Amount (₹)': category_totals.values
+                f'Amount ({currency})': category_totals.values
             })
-            tag_df['Amount (₹)'] = tag_df['Amount (₹)'].apply(lambda x: f"₹{x:,.2f}")
+            tag_df[f'Amount ({currency})'] = tag_df[f'Amount ({currency})'].apply(lambda x: f"{symbol}{x:,.2f}")
             st.table(tag_df)
             
             total_amount = yearly_df['amount'].sum()
-            st.write(f"Total amount spent in {selected_year}: ₹{total_amount:,.2f}")
+            st.write(f"Total amount spent in {selected_year}: {symbol}{total_amount:,.2f}")
         except Exception as e:
             st.error(f"Error processing tags: {str(e)}")
 
@@ -5,6 +5,12 @@ from fpdf import FPDF
 from io import BytesIO
 import plotly.express as px
 import os
+from forecast import record_transactions
+from categorizer import update_model, predict_tags
+from periods import period_key, slice_periods, slice_year
+import write_queue
+from ledger import CATEGORICAL_COLUMNS, DEFAULT_ACCOUNT, LEDGER_COLUMNS, ensure_ledger_columns, load_ledger_in
+from fx import BASE_CURRENCY, available_currencies, load_fx_rates
 
 def check_and_initialize_user_data():
     """Ensure the user's data directory and file exist."""
@@ -19,14 +25,31 @@ def check_and_initialize_user_data():
     if not os.path.exists(user_file):
         with open(user_file, mode='w', newline='', encoding='utf-8') as file:
             writer = csv.writer(file)
-            writer.writerow(['date', 'Account Name', 'description', 'amount', 'category', 'type', 'payment_method', 'tags'])
+            writer.writerow(LEDGER_COLUMNS)
         st.info(f"Data file created for {username}. Start by adding your first transaction.")
+    ensure_ledger_columns(user_file)
     return user_file
 
+def track_write(label, future):
+    """Remembers a queued write so its outcome can be reported on a later render."""
+    st.session_state.setdefault("pending_writes", []).append((label, future))
+
+def report_writes():
+    """Reports queued writes that have completed since the last render."""
+    still_pending = []
+    for label, future in st.session_state.get("pending_writes", []):
+        if not future.done():
+            still_pending.append((label, future))
+        elif future.exception() is not None:
+            st.error(f"Failed to save {label}: {str(future.exception())}")
+        else:
+            st.toast(f"{label} saved")
+    st.session_state["pending_writes"] = still_pending
+
 def add_transaction():
     try:
         try:
-            tag_mapping_df = pd.read_csv("data/tag_mapping.csv")
+            tag_mapping_df = write_queue.read_csv("data/tag_mapping.csv")
             tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
         except Exception as e:
             st.error("Failed to load tag mapping from CSV.")
@@ -46,10 +69,12 @@ def add_transaction():
             amount_str = st.text_input("Amount")
             category = st.selectbox("Category", ["Income", "Expense"])
             payment_method = st.selectbox("Payment Method", ["Cash", "UPI", "Credit Card", "Debit Card", "Bank Transfer"])
+            account = st.text_input("Account", value=DEFAULT_ACCOUNT)
         with col2:
             st.markdown("<h3 style='color: white;'>Transaction Details</h3>", unsafe_allow_html=True)
             date = st.date_input("Date")
             description = st.text_input("Description")
+            currency = st.selectbox("Currency", available_currencies(load_fx_rates()[0]))
             tag_options = ["Type your own tag"] + list(tag_mapping_df['tag'].unique())
             tag_selection = st.selectbox("Select or Type Tag", tag_options)
             if tag_selection == "Type your own tag":
@@ -67,22 +92,26 @@ def add_transaction():
             else tag_mapping.get(tags.strip().lower(), 'Uncategorized')
         )
         if st.button("Submit"):
-            if not all([account_name, amount, date, description, category, payment_method]):
+            if not all([account_name, amount, date, description, category, payment_method, account]):
                 st.error("Please fill in all fields")
             else:
                 try:
-                    with open(user_file, mode='a', newline='', encoding='utf-8') as file:
-                        writer = csv.writer(file)
-                        writer.writerow([
-                            date,
-                            account_name,
-                            description,
-                            amount,
-                            category,
-                            transaction_type,
-                            payment_method,
-                            tags
-                        ])
+                    future = write_queue.append_rows(user_file, [[
+                        date,
+                        account_name,
+                        description,
+                        amount,
+                        category,
+                        transaction_type,
+                        payment_method,
+                        tags,
+                        account,
+                        currency,
+                        '',
+                        ''
+                    ]])
+                    track_write("Transaction", future)
+                    record_transactions(username, pd.DataFrame({'date': [date], 'amount': [amount], 'tags': [tags], 'currency': [currency]}), tag_mapping, future)
                     st.success("Transaction added successfully!")
                 except Exception as e:
                     st.error(f"Error saving transaction to {user_file}: {str(e)}")
@@ -100,7 +129,7 @@ def view_transaction():
         tag_mapping_file = os.path.join("data", "tag_mapping.csv")
         
         try:
-            tag_mapping_df = pd.read_csv(tag_mapping_file)
+            tag_mapping_df = write_queue.read_csv(tag_mapping_file)
             tag_mapping = pd.Series(tag_mapping_df['category'].values, index=tag_mapping_df['tag'].str.lower()).to_dict()
         except FileNotFoundError:
             st.error(f"Tag mapping file '{tag_mapping_file}' not found!")
@@ -117,9 +146,11 @@ def view_transaction():
         selected_month = st.selectbox("Select Month", options=["All"] + list(month_mapping.keys()))
         
         try:
-            df = pd.read_csv(user_file)
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-            df['year'] = df['date'].dt.year
+            currency = st.session_state.get("reporting_currency", BASE_CURRENCY)
+            ledger_df = write_queue.read_csv(user_file)
+            df = load_ledger_in(user_file, currency)
+            df = df[[column for column in LEDGER_COLUMNS + ['year', 'period'] if column in df.columns]]
+            df = df.astype({column: object for column in CATEGORICAL_COLUMNS if column in df.columns})
         except FileNotFoundError:
             st.error(f"User transaction file '{user_file}' not found!")
             return
@@ -136,31 +167,37 @@ def view_transaction():
         
         if st.button("View Transactions"):
             try:
-                filtered_df = df[df['year'] == selected_year]            
-                if selected_month != "All":
-                    month_number = month_mapping[selected_month]
-                    filtered_df = filtered_df[filtered_df["date"].dt.month == month_number]
+                if selected_month == "All":
+                    filtered_df = slice_year(df, selected_year)
+                else:
+                    filtered_df = slice_periods(df, period_key(selected_year, month_mapping[selected_month]))
                 new_df= filtered_df
                 filtered_df = filtered_df[filtered_df['tags'].isna()]   
                 print(filtered_df["Account Name"])       
                 if not filtered_df.empty:
                     account_names = filtered_df['Account Name'].unique()  
-                    for account_name in account_names:
+                    suggested_tags = predict_tags(update_model(username, ledger_df), pd.DataFrame({'Account Name': account_names}))
+                    for account_name, suggested_tag in zip(account_names, suggested_tags):
                         rows_with_account = filtered_df[filtered_df['Account Name'] == account_name]                          
-                        tag_input = st.text_input(f"Enter tags for transactions with account name: {account_name}")
+                        tag_input = st.text_input(
+                            f"Enter tags for transactions with account name: {account_name}",
+                            placeholder=f"Suggested: {suggested_tag}" if suggested_tag else ""
+                        )
                         if tag_input:
                             for index in rows_with_account.index:
                                 filtered_df.at[index, 'tags'] = tag_input
                             # Append new tags to tag_mapping.csv
                             new_tags = tag_input.split(',')
-                            with open(tag_mapping_file, mode='a', newline='', encoding='utf-8') as file:
-                                writer = csv.writer(file)
-                                for tag in new_tags:
-                                    writer.writerow([tag.strip(), 'Uncategorized'])  # Assuming new tags are Uncategorized
+                            # Assuming new tags are Uncategorized
+                            future = write_queue.append_rows(tag_mapping_file, [[tag.strip(), 'Uncategorized'] for tag in new_tags])
+                            track_write("Tags", future)
                     filtered_df=new_df
                     filtered_df["date"] = filtered_df["date"].dt.date
                     filtered_df['tags'] = filtered_df['tags'].fillna('')
-                    filtered_df['amount'] = pd.to_numeric(filtered_df['amount'], errors='coerce')
+                    missing_rates = int(filtered_df['amount'].isna().sum())
+                    if missing_rates:
+                        st.warning(f"{missing_rates} transactions have no FX rate to {currency} and are left out.")
+                        filtered_df = filtered_df.dropna(subset=['amount'])
                     
                     tags_df = filtered_df.assign(tags=filtered_df['tags'].str.split(',')).explode('tags')
                     tags_df['tags'] = tags_df['tags'].str.strip()
@@ -186,8 +223,10 @@ def view_transaction():
                     else:
                         st.info("No categories found for the selected period.")
                     
-                    filtered_df.rename(columns={'amount': 'amount (INR)'}, inplace=True)
+                    amount_column = f'amount ({currency})'
+                    filtered_df.rename(columns={'amount': amount_column, 'currency': 'recorded currency'}, inplace=True)
                     del filtered_df["year"]
+                    del filtered_df["period"]
                     st.table(filtered_df)
                     
                     excel_buffer = BytesIO()
@@ -207,7 +246,7 @@ def view_transaction():
                     pdf.cell(190, 10, f"Transaction Report - {selected_month} {selected_year}", ln=True, align='C')
                     pdf.ln(10)
                     pdf.set_font("Arial", "B", 10)
-                    cols = ['Date', 'Account Name', 'Description', 'amount (INR)', 'Category', 'Payment Method']
+                    cols = ['Date', 'Account Name', 'Description', amount_column, 'Category', 'Payment Method']
                     col_widths = [25, 35, 60, 35, 35, 35]
                     for col, width in zip(cols, col_widths):
                         pdf.cell(width, 10, col, 1, 0, 'C')
@@ -218,7 +257,7 @@ def view_transaction():
                         pdf.cell(col_widths[0], 10, str(row['date']), 1, 0, 'C')
                         pdf.cell(col_widths[1], 10, str(row['Account Name']), 1, 0, 'C')
                         pdf.cell(col_widths[2], 10, str(row['description'])[:55], 1, 0, 'L')
-                        pdf.cell(col_widths[3], 10, f"{row['amount (INR)']:.2f}", 1, 0, 'R')
+                        pdf.cell(col_widths[3], 10, f"{row[amount_column]:.2f}", 1, 0, 'R')
                         pdf.cell(col_widths[4], 10, str(row['category']), 1, 0, 'C')
                         pdf.cell(col_widths[5], 10, str(row['payment_method']), 1, 1, 'C')
                     
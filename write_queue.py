@@ -0,0 +1,250 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import pandas as pd
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+
+class WriteBehindQueue:
+    """Applies CSV appends and replacements on a background thread.
+
+    Jobs are drained in batches: consecutive appends to the same file are written with a single
+    open, and only the last replacement of a file in a batch is written. Updates apply a
+    function to the current contents of a file on the writer thread, so concurrent
+    read-modify-write cycles do not overwrite each other. Non-CSV files can be replaced with
+    `write_file`. Each submitted job returns a Future that resolves once the write is done and,
+    depending on `fsync_policy`, flushed to disk: 'always' fsyncs after every job, 'batch' once
+    per file per batch and 'never' leaves it to the OS. Until then, `read_csv` merges the
+    pending jobs into its result.
+    """
+
+    def __init__(self, fsync_policy='batch', batch_size=500, batch_wait=0.05):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}")
+        self.fsync_policy = fsync_policy
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._jobs = queue.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def append_rows(self, path, rows):
+        """Queues rows (lists of values) to be appended to the CSV file at `path`."""
+        return self._submit(path, 'append', [list(row) for row in rows])
+
+    def replace_csv(self, path, df):
+        """Queues the CSV file at `path` to be replaced with the contents of `df`."""
+        return self._submit(path, 'replace', df.copy())
+
+    def update_csv(self, path, update):
+        """Queues `update` to be applied to the current contents of the CSV file at `path`.
+
+        `update` receives the file as a DataFrame, or None if it does not exist, and returns the
+        new contents, or None to leave the file unchanged. It may run more than once, so it must
+        not have side effects.
+        """
+        return self._submit(path, 'update', update)
+
+    def write_file(self, path, write):
+        """Queues the file at `path` to be replaced atomically with what `write` writes to it.
+
+        `write` receives the new file opened in binary mode. It runs on the writer thread, so
+        the data it writes must not be modified after the job is queued.
+        """
+        return self._submit(path, 'write', write)
+
+    def _submit(self, path, kind, payload):
+        future = Future()
+        job = (os.path.normpath(path), kind, payload, future)
+        with self._lock:
+            self._pending.setdefault(job[0], []).append(job)
+        self._jobs.put(job)
+        return future
+
+    def _path_lock(self, path):
+        with self._lock:
+            return self._path_locks.setdefault(path, threading.Lock())
+
+    def exists(self, path):
+        """Returns True if the file exists on disk or has pending writes."""
+        return self.has_pending(path) or os.path.exists(path)
+
+    def has_pending(self, path):
+        """Returns True if writes to `path` are still queued."""
+        with self._lock:
+            return bool(self._pending.get(os.path.normpath(path)))
+
+    def read_csv(self, path, **kwargs):
+        """Reads a CSV file as it will look once all pending writes to it are applied.
+
+        `kwargs` are passed to `pd.read_csv` and only apply to the contents on disk; pending
+        replacements and appended rows are merged in as they were queued, so options such as
+        `dtype`, `parse_dates` or `nrows` should be applied again to the result where they matter.
+        """
+        path = os.path.normpath(path)
+        with self._path_lock(path):
+            with self._lock:
+                jobs = list(self._pending.get(path, []))
+            replaced = [i for i, job in enumerate(jobs) if job[1] == 'replace']
+            if replaced:
+                df = jobs[replaced[-1]][2].copy()
+                jobs = jobs[replaced[-1] + 1:]
+            elif os.path.exists(path) or not jobs:
+                df = pd.read_csv(path, **kwargs)
+            else:
+                df = None
+        rows = []
+        for job in jobs:
+            if job[1] == 'append':
+                rows.extend(job[2])
+                continue
+            df = self._with_rows(df, rows)
+            rows = []
+            updated = job[2](df)
+            df = df if updated is None else updated
+        df = self._with_rows(df, rows)
+        if df is None:
+            raise FileNotFoundError(path)
+        return df
+
+    @staticmethod
+    def _with_rows(df, rows):
+        if not rows or df is None:
+            return df
+        appended = pd.DataFrame(rows, columns=df.columns[:len(rows[0])])
+        return pd.concat([df, appended], ignore_index=True)
+
+    def flush(self, timeout=None):
+        """Blocks until every job queued so far has been written; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._jobs.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._jobs.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._jobs.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+            for _ in batch:
+                self._jobs.task_done()
+
+    def _write_batch(self, batch):
+        by_path = {}
+        for job in batch:
+            by_path.setdefault(job[0], []).append(job)
+        for path, jobs in by_path.items():
+            # Only writers and readers of this file wait on its lock; other files stay available.
+            with self._path_lock(path):
+                try:
+                    self._write_file(path, jobs)
+                    error = None
+                except Exception as e:
+                    error = e
+                written = {id(job) for job in jobs}
+                with self._lock:
+                    pending = self._pending.get(path, [])
+                    self._pending[path] = [job for job in pending if id(job) not in written]
+                    if not self._pending[path]:
+                        del self._pending[path]
+            for job in jobs:
+                if error is None:
+                    job[3].set_result(path)
+                else:
+                    job[3].set_exception(error)
+
+    def _write_file(self, path, jobs):
+        start = 0
+        for i, job in enumerate(jobs):
+            if job[1] != 'update':
+                continue
+            self._write_jobs(path, jobs[start:i])
+            updated = job[2](pd.read_csv(path) if os.path.exists(path) else None)
+            if updated is not None:
+                self._write_jobs(path, [(path, 'replace', updated, job[3])])
+            start = i + 1
+        self._write_jobs(path, jobs[start:])
+
+    def _write_jobs(self, path, jobs):
+        replacing = [i for i, job in enumerate(jobs) if job[1] in ('replace', 'write')]
+        last_replace = replacing[-1] if replacing else None
+        if last_replace is not None:
+            temp_path = f"{path}.tmp"
+            if jobs[last_replace][1] == 'write':
+                with open(temp_path, mode='wb') as file:
+                    jobs[last_replace][2](file)
+                    self._sync(file, last=True)
+            else:
+                with open(temp_path, mode='w', newline='', encoding='utf-8') as file:
+                    jobs[last_replace][2].to_csv(file, index=False)
+                    self._sync(file, last=True)
+            os.replace(temp_path, path)
+            jobs = jobs[last_replace + 1:]
+        if not jobs:
+            return
+        with open(path, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            for i, job in enumerate(jobs):
+                writer.writerows(job[2])
+                self._sync(file, last=i == len(jobs) - 1)
+
+    def _sync(self, file, last):
+        if self.fsync_policy == 'always' or (self.fsync_policy == 'batch' and last):
+            file.flush()
+            os.fsync(file.fileno())
+
+_writer = WriteBehindQueue()
+atexit.register(_writer.flush, 10)
+
+def append_rows(path, rows):
+    """Queues rows to be appended to a CSV file; returns a Future resolved once they are durable."""
+    return _writer.append_rows(path, rows)
+
+def replace_csv(path, df):
+    """Queues a CSV file to be replaced with `df`; returns a Future resolved once it is durable."""
+    return _writer.replace_csv(path, df)
+
+def update_csv(path, update):
+    """Queues a read-modify-write of a CSV file; returns a Future resolved once it is durable."""
+    return _writer.update_csv(path, update)
+
+def write_file(path, write):
+    """Queues a file to be replaced with the bytes `write` writes; returns a Future resolved once durable."""
+    return _writer.write_file(path, write)
+
+def read_csv(path, **kwargs):
+    """Reads a CSV file including queued writes; `kwargs` only apply to the contents on disk."""
+    return _writer.read_csv(path, **kwargs)
+
+def exists(path):
+    """Returns True if a file exists on disk or has queued writes."""
+    return _writer.exists(path)
+
+def file_version(path):
+    """Returns an 'mtime_ns-size' stamp identifying the contents of a file on disk, or '' if missing."""
+    if not os.path.exists(path):
+        return ''
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+def has_pending_writes(path):
+    """Returns True if writes to `path` are still queued."""
+    return _writer.has_pending(path)
+
+def flush(timeout=None):
+    """Waits for all queued writes to reach disk."""
+    return _writer.flush(timeout)